@@ -9,6 +9,46 @@ import sys
 import os
 import urllib.parse
 
+try:
+    # Optional C-backed HTTP parser; falls back to pure Python below
+    import httptools
+except ImportError:
+    httptools = None
+
+# Socket buffer size (bytes); large enough to cover the bandwidth-delay
+# product on fast links so downloads are not receive-window limited.
+SOCKET_BUFFER_SIZE = int(os.environ.get('LAB1_SOCKBUF', 4 * 1024 * 1024))
+
+# Request line and headers as one precompiled bytes template
+REQUEST_TEMPLATE = b"GET %s HTTP/1.1\r\nHost: %s:%d\r\nConnection: close\r\n\r\n"
+
+# Wire boundary between the header block and the body. partition() would
+# locate it in one call but copies the body; a single find() plus a
+# memoryview slice keeps the body zero-copy.
+HEADER_SEP = b'\r\n\r\n'
+
+class ResponseCollector:
+    """Callback target for httptools.HttpResponseParser"""
+
+    def __init__(self):
+        self.status_text = ''
+        self.content_type = 'text/plain'
+        self.body = bytearray()
+        self.complete = False
+
+    def on_status(self, status):
+        self.status_text = status.decode('latin-1')
+
+    def on_header(self, name, value):
+        if name.lower() == b'content-type':
+            self.content_type = value.decode('latin-1')
+
+    def on_body(self, data):
+        self.body.extend(data)
+
+    def on_message_complete(self):
+        self.complete = True
+
 class HTTPClient:
     def __init__(self):
         self.socket = None
@@ -18,26 +58,23 @@ class HTTPClient:
         try:
             # Create socket connection
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Tune buffers before connect so they apply to the whole transfer
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.socket.connect((host, port))
-            
-            # Send HTTP GET request
-            request = f"GET {path} HTTP/1.1\r\n"
-            request += f"Host: {host}:{port}\r\n"
-            request += "Connection: close\r\n"
-            request += "\r\n"
-            
-            self.socket.send(request.encode('utf-8'))
-            
-            # Receive response
-            response_data = b""
-            while True:
-                data = self.socket.recv(4096)
-                if not data:
-                    break
-                response_data += data
-            
-            # Parse response
-            self.parse_response(response_data, path, save_directory)
+
+            # Send HTTP GET request; sendall guarantees full delivery
+            # where a bare send() may write only part of the buffer
+            request_bytes = REQUEST_TEMPLATE % (path.encode('utf-8'), host.encode('ascii'), port)
+            self.socket.sendall(request_bytes)
+
+            if httptools is not None:
+                # Feed chunks straight into the C parser - no accumulation
+                # of the full response and no Python-level header splitting
+                self.receive_httptools(path, save_directory)
+            else:
+                self.receive_buffered(path, save_directory)
             
         except socket.error as e:
             print(f"Connection error: {e}")
@@ -47,86 +84,131 @@ class HTTPClient:
             if self.socket:
                 self.socket.close()
 
+    def receive_httptools(self, path, save_directory):
+        """Receive the response, parsing it incrementally with httptools"""
+        collector = ResponseCollector()
+        parser = httptools.HttpResponseParser(collector)
+        chunk = bytearray(65536)
+        while not collector.complete:
+            n = self.socket.recv_into(chunk)
+            if not n:
+                break
+            parser.feed_data(memoryview(chunk)[:n])
+
+        status_code = parser.get_status_code()
+        body = memoryview(collector.body)
+
+        print(f"Status: {status_code} {collector.status_text}")
+        print(f"Content-Type: {collector.content_type}")
+        print(f"Content-Length: {len(body)}")
+        print()
+
+        self.handle_content(status_code, collector.status_text,
+                            collector.content_type, body, path, save_directory)
+
+    def receive_buffered(self, path, save_directory):
+        """Receive the full response then parse it in pure Python"""
+        # recv_into avoids the O(N^2) `response_data += data` pattern and
+        # the throwaway bytes object allocated by every recv() call.
+        buf = bytearray(65536)
+        pos = 0
+        while True:
+            n = self.socket.recv_into(memoryview(buf)[pos:])
+            if not n:
+                break
+            pos += n
+            if pos == len(buf):
+                # Buffer full: double capacity
+                buf.extend(b"\x00" * len(buf))
+        del buf[pos:]
+
+        self.parse_response(buf, path, save_directory)
+
     def parse_response(self, response_data, path, save_directory):
         """Parse HTTP response and handle based on content type"""
         try:
-            # Split headers and body
-            header_end = response_data.find(b'\r\n\r\n')
+            # Split headers and body at the wire boundary
+            header_end = response_data.find(HEADER_SEP)
             if header_end == -1:
                 print("Invalid HTTP response")
                 return
-            
-            headers = response_data[:header_end].decode('utf-8')
-            body = response_data[header_end + 4:]
-            
+
+            # Split the header block on raw bytes; only the tiny status
+            # line and the header values we use are ever decoded
+            header_lines = bytes(response_data[:header_end]).split(b'\r\n')
+            # A memoryview keeps the body as a zero-copy slice of the buffer
+            body = memoryview(response_data)[header_end + len(HEADER_SEP):]
+
             # Parse status line
-            header_lines = headers.split('\r\n')
-            status_line = header_lines[0]
-            status_parts = status_line.split(' ', 2)
+            status_parts = header_lines[0].split(b' ', 2)
             status_code = int(status_parts[1])
-            status_text = status_parts[2] if len(status_parts) > 2 else ''
-            
+            status_text = status_parts[2].decode('ascii', errors='ignore') if len(status_parts) > 2 else ''
+
             print(f"Status: {status_code} {status_text}")
-            
+
             # Parse headers
             content_type = 'text/plain'
             content_length = len(body)
-            
+
             for line in header_lines[1:]:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower()
-                    value = value.strip()
-                    
-                    if key == 'content-type':
-                        content_type = value
-                    elif key == 'content-length':
-                        content_length = int(value)
+                key, sep, value = line.partition(b':')
+                if not sep:
+                    continue
+                key = key.strip().lower()
+                if key == b'content-type':
+                    content_type = value.strip().decode('ascii')
+                elif key == b'content-length':
+                    content_length = int(value)
             
             print(f"Content-Type: {content_type}")
             print(f"Content-Length: {content_length}")
             print()
-            
-            # Handle based on status code
-            if status_code != 200:
-                print(f"Error: {status_code} {status_text}")
-                if body:
-                    print(body.decode('utf-8', errors='ignore'))
-                return
-            
-            # Handle based on content type
-            if content_type.startswith('text/html'):
-                # Display HTML content
-                print("HTML Content:")
-                print("-" * 50)
-                print(body.decode('utf-8', errors='ignore'))
-                
-            elif content_type in ['image/png', 'application/pdf', 'image/jpeg', 'image/gif']:
-                # Save binary files
-                filename = self.get_filename_from_path(path, content_type)
-                file_path = os.path.join(save_directory, filename)
-                
-                # Ensure save directory exists
-                os.makedirs(save_directory, exist_ok=True)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(body)
-                
-                print(f"File saved as: {file_path}")
-                print(f"File size: {len(body)} bytes")
-                
-            else:
-                # Display other text content
-                print("Content:")
-                print("-" * 50)
-                try:
-                    print(body.decode('utf-8'))
-                except UnicodeDecodeError:
-                    print(body.decode('utf-8', errors='ignore'))
-                    
+
+            self.handle_content(status_code, status_text, content_type,
+                                body, path, save_directory)
+
         except Exception as e:
             print(f"Error parsing response: {e}")
 
+    def handle_content(self, status_code, status_text, content_type, body, path, save_directory):
+        """Display or save the response body based on status and content type"""
+        # Handle based on status code
+        if status_code != 200:
+            print(f"Error: {status_code} {status_text}")
+            if body:
+                print(str(body, 'utf-8', 'ignore'))
+            return
+
+        # Handle based on content type
+        if content_type.startswith('text/html'):
+            # Display HTML content
+            print("HTML Content:")
+            print("-" * 50)
+            print(str(body, 'utf-8', 'ignore'))
+
+        elif content_type in ['image/png', 'application/pdf', 'image/jpeg', 'image/gif']:
+            # Save binary files
+            filename = self.get_filename_from_path(path, content_type)
+            file_path = os.path.join(save_directory, filename)
+
+            # Ensure save directory exists
+            os.makedirs(save_directory, exist_ok=True)
+
+            with open(file_path, 'wb') as f:
+                f.write(body)
+
+            print(f"File saved as: {file_path}")
+            print(f"File size: {len(body)} bytes")
+
+        else:
+            # Display other text content
+            print("Content:")
+            print("-" * 50)
+            try:
+                print(str(body, 'utf-8'))
+            except UnicodeDecodeError:
+                print(str(body, 'utf-8', 'ignore'))
+
     def get_filename_from_path(self, path, content_type):
         """Extract filename from URL path"""
         # Get the last part of the path
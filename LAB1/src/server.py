@@ -5,91 +5,260 @@ Serves files from a specified directory with support for HTML, PNG, and PDF file
 Handles directory listings and nested directories.
 """
 
+import functools
+import logging
+import mmap
 import socket
 import os
+import stat
 import sys
+import threading
 import urllib.parse
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Per-request logging is debug-level: a no-op unless LAB1_LOG=DEBUG, so
+# the default path skips the formatted string and the stdout lock entirely
+log = logging.getLogger("http")
+
+# Socket buffer size (bytes). Sized well above the default ~85KB so fast
+# LAN/loopback transfers are not limited by the bandwidth-delay product.
+SOCKET_BUFFER_SIZE = int(os.environ.get('LAB1_SOCKBUF', 4 * 1024 * 1024))
+
+# Below this size, serve files with read()+send(); the sendfile(2) setup
+# cost only pays off once the copy being avoided is big enough.
+SENDFILE_THRESHOLD = 16 * 1024
+
+# How long an idle keep-alive connection may pin a worker thread
+KEEPALIVE_TIMEOUT = float(os.environ.get('LAB1_KEEPALIVE_TIMEOUT', 5.0))
+
+# Supported MIME types, keyed by lowercased extension. Module-level so
+# every worker thread shares one table via a cheap global lookup.
+_MIME = {
+    '.html': 'text/html',
+    '.htm': 'text/html',
+    '.png': 'image/png',
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.txt': 'text/plain'
+}
+
+# Constant response headers, encoded once at import instead of per request
+COMMON_HEADERS = (
+    b"Server: Python HTTP File Server\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET, HEAD, OPTIONS\r\n"
+    b"Access-Control-Allow-Headers: Content-Type\r\n"
+    b"\r\n"
+)
+
+# Static page templates; the 404 body is pre-encoded since it never varies
+NOT_FOUND_HTML = b"""<!DOCTYPE html>
+<html>
+<head>
+    <title>404 Not Found</title>
+    <style>
+        body { font-family: Arial, sans-serif; text-align: center; margin-top: 100px; }
+        h1 { color: #cc0000; }
+    </style>
+</head>
+<body>
+    <h1>404 - File Not Found</h1>
+    <p>The requested file could not be found on this server.</p>
+</body>
+</html>"""
+
+LISTING_HEAD_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Directory listing for {url_path}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; }}
+        h1 {{ color: #333; }}
+        table {{ border-collapse: collapse; width: 100%; }}
+        th, td {{ text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }}
+        th {{ background-color: #f2f2f2; }}
+        a {{ text-decoration: none; color: #0066cc; }}
+        a:hover {{ text-decoration: underline; }}
+        .size {{ text-align: right; }}
+        .date {{ white-space: nowrap; }}
+    </style>
+</head>
+<body>
+    <h1>Directory listing for {url_path}</h1>
+    <hr>
+    <table>
+        <tr>
+            <th>Name</th>
+            <th>Size</th>
+            <th>Last Modified</th>
+        </tr>"""
+
+LISTING_FOOT = """
+    </table>
+    <hr>
+    <p><em>Python HTTP File Server</em></p>
+</body>
+</html>"""
+
+# Hot paths repeat constantly, so the realpath stat chain is ~free after
+# the first request for each path
+@functools.lru_cache(maxsize=1024)
+def _cached_realpath(file_path):
+    return os.path.realpath(file_path)
+
+def tune_socket(sock):
+    """Apply throughput-oriented socket options (large buffers, no Nagle)"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
 class HTTPServer:
-    def __init__(self, host='0.0.0.0', port=8080, directory='.'):
+    def __init__(self, host='0.0.0.0', port=8080, directory='.', workers=8):
         self.host = host
         self.port = port
-        self.directory = os.path.abspath(directory)
+        # realpath, not abspath: request paths are symlink-resolved before
+        # the containment check, so the base must be canonical too or a
+        # symlinked serve directory would 403 everything
+        self.directory = os.path.realpath(directory)
+        self.workers = max(1, workers)
         self.socket = None
-        
-        # Supported MIME types
-        self.mime_types = {
-            '.html': 'text/html',
-            '.htm': 'text/html',
-            '.png': 'image/png',
-            '.pdf': 'application/pdf',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif',
-            '.css': 'text/css',
-            '.js': 'application/javascript',
-            '.txt': 'text/plain'
-        }
+        self.executor = None
+
+        # Rendered directory listings keyed by path -> (dir mtime, bytes).
+        # Worst case two workers race and both rebuild the same listing,
+        # which is harmless, so no lock is needed.
+        self._listing_cache = {}
+
+        # Per-worker receive buffer, allocated once per thread and reused
+        # across every request that thread serves
+        self._tls = threading.local()
 
     def start(self):
         """Start the HTTP server"""
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+
         try:
             self.socket.bind((self.host, self.port))
-            self.socket.listen(5)
+            self.socket.listen(128)
             print(f"Server started at http://{self.host}:{self.port}")
             print(f"Serving directory: {self.directory}")
+            print(f"Worker threads: {self.workers}")
             print("Press Ctrl+C to stop the server")
-            
+
+            # Hand each connection to the pool so slow clients and disk
+            # reads never block the accept loop
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
             while True:
                 client_socket, client_address = self.socket.accept()
-                print(f"Connection from {client_address}")
-                self.handle_request(client_socket)
-                client_socket.close()
-                
+                log.debug("Connection from %s", client_address)
+                self.executor.submit(self.handle_connection, client_socket)
+
         except KeyboardInterrupt:
             print("\nServer stopped")
         finally:
+            if self.executor:
+                self.executor.shutdown(wait=True, cancel_futures=True)
             if self.socket:
                 self.socket.close()
 
+    def handle_connection(self, client_socket):
+        """Serve requests from one connection until the client is done"""
+        try:
+            tune_socket(client_socket)
+            client_socket.settimeout(KEEPALIVE_TIMEOUT)
+            # The per-thread buffer may hold leftover bytes from the
+            # previous connection served by this worker; drop them
+            self._tls.pending = 0
+            # Keep-alive: each additional request on the same socket skips
+            # a TCP handshake and teardown
+            while self.handle_request(client_socket):
+                pass
+        finally:
+            try:
+                client_socket.close()
+            except OSError:
+                pass
+
     def handle_request(self, client_socket):
-        """Handle incoming HTTP request"""
+        """Handle one HTTP request; return True to keep the connection"""
         try:
-            # Receive request data
-            request_data = client_socket.recv(1024).decode('utf-8')
-            if not request_data:
-                return
+            # Receive into the thread's reusable buffer until the header
+            # terminator arrives; a single recv(1024) can truncate requests
+            # with long URLs or many headers
+            buf = getattr(self._tls, 'buf', None)
+            if buf is None:
+                buf = self._tls.buf = bytearray(8192)
+            # Pipelined bytes carried over from the previous request on
+            # this connection are already at the front of the buffer
+            pos = getattr(self._tls, 'pending', 0)
+            self._tls.pending = 0
+            header_end = buf.find(b'\r\n\r\n', 0, pos) if pos else -1
+            while header_end == -1:
+                try:
+                    n = client_socket.recv_into(memoryview(buf)[pos:])
+                except socket.timeout:
+                    return False
+                if not n:
+                    if pos == 0:
+                        return False
+                    break
+                pos += n
+                header_end = buf.find(b'\r\n\r\n', 0, pos)
+                if pos == len(buf):
+                    break
+            if header_end == -1:
+                header_end = pos
 
-            # Parse the request
+            # Keep whatever follows this request's header terminator: a
+            # pipelining client may already have sent the next request,
+            # and discarding it would stall the connection
+            consumed = min(header_end + 4, pos)
+            if consumed < pos:
+                buf[:pos - consumed] = buf[consumed:pos]
+                self._tls.pending = pos - consumed
+
+            # Decode only the header section, not the whole buffer
+            request_data = bytes(memoryview(buf)[:header_end]).decode('ascii', errors='ignore')
             request_lines = request_data.split('\r\n')
             request_line = request_lines[0]
             method, path, version = request_line.split()
-            
-            print(f"Request: {method} {path}")
+
+            # HTTP/1.1 defaults to keep-alive unless the client opts out
+            conn_header = ''
+            for line in request_lines[1:]:
+                if line[:11].lower() == 'connection:':
+                    conn_header = line[11:].strip().lower()
+                    break
+            if version == 'HTTP/1.1':
+                keep_alive = conn_header != 'close'
+            else:
+                keep_alive = conn_header == 'keep-alive'
+
+            log.debug("Request: %s %s", method, path)
             
             # Handle OPTIONS requests for CORS preflight
             if method == 'OPTIONS':
-                self.send_response(client_socket, 200, "OK", "text/plain", "")
-                return
-            
+                self.send_response(client_socket, 200, "OK", "text/plain", "", keep_alive)
+                return keep_alive
+
             # Only handle GET requests (and OPTIONS above)
             if method != 'GET':
-                self.send_response(client_socket, 405, "Method Not Allowed", "text/plain")
-                return
+                self.send_response(client_socket, 405, "Method Not Allowed", "text/plain",
+                                   keep_alive=keep_alive)
+                return keep_alive
             
             # Decode URL and remove query parameters
             path = urllib.parse.unquote(path.split('?')[0])
-            
-            # Security check: prevent directory traversal
-            if '..' in path:
-                self.send_response(client_socket, 403, "Forbidden", "text/plain")
-                return
-            
+
             # Convert URL path to file system path
             # Handle both files and directories properly
             if path == '/':
@@ -98,88 +267,110 @@ class HTTPServer:
                 # Remove leading slash and join with directory
                 relative_path = path.lstrip('/')
                 file_path = os.path.join(self.directory, relative_path)
+
+            # Security check: resolve symlinks and dot segments, then
+            # require the result to live under the served directory.
+            # A bare prefix/startswith compare would wave through sibling
+            # directories like /srv/content2, and rejecting any '..' in
+            # the URL would block legitimate names containing dots.
+            real_path = _cached_realpath(file_path)
+            if os.path.commonpath([real_path, self.directory]) != self.directory:
+                self.send_response(client_socket, 403, "Forbidden", "text/plain",
+                                   keep_alive=keep_alive)
+                return keep_alive
+            file_path = real_path
             
-            # Normalize the path to resolve any .. or . components
-            file_path = os.path.normpath(file_path)
-            
-            # Ensure the path is within the served directory (security check)
-            if not file_path.startswith(self.directory):
-                self.send_response(client_socket, 403, "Forbidden", "text/plain")
-                return
-            
-            # Handle the request based on what the path points to
-            if os.path.isfile(file_path):
-                self.serve_file(client_socket, file_path)
-            elif os.path.isdir(file_path):
-                self.serve_directory(client_socket, file_path, path)
+            # One stat covers the file/directory dispatch and the file
+            # size, instead of isfile + isdir + fstat (three syscalls)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                self.send_404(client_socket, keep_alive)
+                return keep_alive
+
+            if stat.S_ISREG(st.st_mode):
+                self.serve_file(client_socket, file_path, st, keep_alive)
+            elif stat.S_ISDIR(st.st_mode):
+                self.serve_directory(client_socket, file_path, path, keep_alive)
             else:
-                self.send_404(client_socket)
-                
+                self.send_404(client_socket, keep_alive)
+
+            return keep_alive
+
         except Exception as e:
-            print(f"Error handling request: {e}")
-            self.send_response(client_socket, 500, "Internal Server Error", "text/plain")
+            log.error("Error handling request: %s", e)
+            try:
+                self.send_response(client_socket, 500, "Internal Server Error", "text/plain")
+            except OSError:
+                pass
+            return False
 
-    def serve_file(self, client_socket, file_path):
+    def serve_file(self, client_socket, file_path, st, keep_alive=False):
         """Serve a file to the client"""
         try:
             with open(file_path, 'rb') as file:
-                content = file.read()
-            
-            # Get MIME type
-            _, ext = os.path.splitext(file_path)
-            content_type = self.mime_types.get(ext.lower(), 'application/octet-stream')
-            
-            # Send response
-            self.send_response(client_socket, 200, "OK", content_type, content)
-            
+                # Get MIME type: rfind + slice beats splitext's full scan,
+                # and the table keys are already lowercased
+                dot = file_path.rfind('.')
+                ext = file_path[dot:].lower() if dot >= 0 else ''
+                content_type = _MIME.get(ext, 'application/octet-stream')
+
+                file_size = st.st_size
+                if file_size < SENDFILE_THRESHOLD:
+                    # Small files: syscall setup cost outweighs the copy
+                    self.send_response(client_socket, 200, "OK", content_type, file.read(),
+                                       keep_alive)
+                else:
+                    # Large files: headers first, then the body without
+                    # materializing it as a Python bytes object
+                    self.send_headers(client_socket, 200, "OK", content_type, file_size,
+                                      keep_alive)
+                    if hasattr(os, 'sendfile'):
+                        # Kernel-to-kernel via sendfile(2) - no userspace copy
+                        client_socket.sendfile(file, 0, file_size)
+                    else:
+                        # No sendfile (e.g. Windows): memory-map the file so
+                        # the kernel pages in only what is being written to
+                        # the socket, instead of doubling RSS with read()
+                        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            client_socket.sendall(mm)
+
         except IOError:
-            self.send_404(client_socket)
+            self.send_404(client_socket, keep_alive)
 
-    def serve_directory(self, client_socket, dir_path, url_path):
+    def serve_directory(self, client_socket, dir_path, url_path, keep_alive=False):
         """Serve directory listing"""
         try:
-            items = os.listdir(dir_path)
-            items.sort()
-            
+            # Serve the cached rendering while the directory is unchanged
+            dir_mtime = os.stat(dir_path).st_mtime
+            cached = self._listing_cache.get(dir_path)
+            if cached and cached[0] == dir_mtime:
+                self.send_response(client_socket, 200, "OK", "text/html", cached[1],
+                                   keep_alive)
+                return
+
+            # One scandir pass; DirEntry caches the stat result each entry
+            # needs, instead of three stat calls per item
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+
             # Generate HTML directory listing
-            html = self.generate_directory_listing(items, dir_path, url_path)
-            
-            self.send_response(client_socket, 200, "OK", "text/html", html.encode('utf-8'))
-            
+            html = self.generate_directory_listing(entries, url_path)
+            content = html.encode('utf-8')
+            self._listing_cache[dir_path] = (dir_mtime, content)
+
+            self.send_response(client_socket, 200, "OK", "text/html", content, keep_alive)
+
         except OSError:
-            self.send_404(client_socket)
+            self.send_404(client_socket, keep_alive)
 
-    def generate_directory_listing(self, items, dir_path, url_path):
+    def generate_directory_listing(self, entries, url_path):
         """Generate HTML directory listing"""
         # Ensure url_path ends with / for proper URL construction
         if not url_path.endswith('/'):
             url_path = url_path + '/'
         
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>Directory listing for {url_path}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 40px; }}
-        h1 {{ color: #333; }}
-        table {{ border-collapse: collapse; width: 100%; }}
-        th, td {{ text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }}
-        th {{ background-color: #f2f2f2; }}
-        a {{ text-decoration: none; color: #0066cc; }}
-        a:hover {{ text-decoration: underline; }}
-        .size {{ text-align: right; }}
-        .date {{ white-space: nowrap; }}
-    </style>
-</head>
-<body>
-    <h1>Directory listing for {url_path}</h1>
-    <hr>
-    <table>
-        <tr>
-            <th>Name</th>
-            <th>Size</th>
-            <th>Last Modified</th>
-        </tr>"""
+        parts = [LISTING_HEAD_TEMPLATE.format(url_path=url_path)]
         
         # Add parent directory link if not root
         if url_path != '/':
@@ -188,52 +379,48 @@ class HTTPServer:
                 parent_path = '/'.join(parent_parts[:-1]) + '/'
             else:
                 parent_path = '/'
-            html += f"""
+            parts.append(f"""
         <tr>
             <td><a href="{parent_path}">../</a></td>
             <td class="size">-</td>
             <td class="date">-</td>
-        </tr>"""
+        </tr>""")
         
         # Add directory contents
-        for item in items:
-            item_path = os.path.join(dir_path, item)
-            
-            if os.path.isdir(item_path):
-                name = item + '/'
+        for entry in entries:
+            # One stat per entry, served from the DirEntry cache
+            try:
+                st = entry.stat()
+            except OSError:
+                st = None
+
+            if entry.is_dir(follow_symlinks=False):
+                name = entry.name + '/'
                 size = '-'
                 # For directories, add trailing slash
-                item_url = url_path + urllib.parse.quote(item) + '/'
+                item_url = url_path + urllib.parse.quote(entry.name) + '/'
             else:
-                name = item
-                try:
-                    size = self.format_size(os.path.getsize(item_path))
-                except OSError:
-                    size = '-'
+                name = entry.name
+                size = self.format_size(st.st_size) if st else '-'
                 # For files, no trailing slash
-                item_url = url_path + urllib.parse.quote(item)
-            
-            try:
-                mtime = os.path.getmtime(item_path)
-                date = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-            except OSError:
+                item_url = url_path + urllib.parse.quote(entry.name)
+
+            if st:
+                date = datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+            else:
                 date = '-'
             
-            html += f"""
+            parts.append(f"""
         <tr>
             <td><a href="{item_url}">{name}</a></td>
             <td class="size">{size}</td>
             <td class="date">{date}</td>
-        </tr>"""
-        
-        html += """
-    </table>
-    <hr>
-    <p><em>Python HTTP File Server</em></p>
-</body>
-</html>"""
+        </tr>""")
         
-        return html
+        parts.append(LISTING_FOOT)
+
+        # Joining once is linear in output size; repeated += is quadratic
+        return "".join(parts)
 
     def format_size(self, size):
         """Format file size in human readable format"""
@@ -243,43 +430,48 @@ class HTTPServer:
             size /= 1024.0
         return f"{size:.1f}TB"
 
-    def send_response(self, client_socket, status_code, status_text, content_type, content=None):
+    def build_headers(self, status_code, status_text, content_type, content_length,
+                      keep_alive=False):
+        """Build the status line and headers as a single bytes object"""
+        # Only the status line, Content-Type, Content-Length and Connection
+        # vary; the CORS/Server block is a pre-encoded constant
+        connection = 'keep-alive' if keep_alive else 'close'
+        variable = (f"HTTP/1.1 {status_code} {status_text}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {content_length}\r\n"
+                    f"Connection: {connection}\r\n")
+        return variable.encode('utf-8') + COMMON_HEADERS
+
+    def send_headers(self, client_socket, status_code, status_text, content_type,
+                     content_length, keep_alive=False):
+        """Send the HTTP status line and headers only"""
+        client_socket.sendall(self.build_headers(status_code, status_text,
+                                                 content_type, content_length, keep_alive))
+
+    def send_response(self, client_socket, status_code, status_text, content_type,
+                      content=None, keep_alive=False):
         """Send HTTP response to client"""
         if content is None:
             content = status_text.encode('utf-8')
         elif isinstance(content, str):
             content = content.encode('utf-8')
-        
-        response = f"HTTP/1.1 {status_code} {status_text}\r\n"
-        response += f"Content-Type: {content_type}\r\n"
-        response += f"Content-Length: {len(content)}\r\n"
-        response += f"Server: Python HTTP File Server\r\n"
-        # Add CORS headers for web client support
-        response += f"Access-Control-Allow-Origin: *\r\n"
-        response += f"Access-Control-Allow-Methods: GET, HEAD, OPTIONS\r\n"
-        response += f"Access-Control-Allow-Headers: Content-Type\r\n"
-        response += "\r\n"
-        
-        client_socket.send(response.encode('utf-8'))
-        client_socket.send(content)
 
-    def send_404(self, client_socket):
+        headers = self.build_headers(status_code, status_text, content_type, len(content),
+                                     keep_alive)
+        if hasattr(client_socket, 'sendmsg'):
+            # Scatter-gather: headers and body leave in one syscall without
+            # concatenating the two buffers first
+            sent = client_socket.sendmsg([headers, content])
+            remaining = len(headers) + len(content) - sent
+            if remaining:
+                client_socket.sendall(b"".join((headers, content))[sent:])
+        else:
+            client_socket.sendall(b"".join((headers, content)))
+
+    def send_404(self, client_socket, keep_alive=False):
         """Send 404 Not Found response"""
-        html = """<!DOCTYPE html>
-<html>
-<head>
-    <title>404 Not Found</title>
-    <style>
-        body { font-family: Arial, sans-serif; text-align: center; margin-top: 100px; }
-        h1 { color: #cc0000; }
-    </style>
-</head>
-<body>
-    <h1>404 - File Not Found</h1>
-    <p>The requested file could not be found on this server.</p>
-</body>
-</html>"""
-        self.send_response(client_socket, 404, "Not Found", "text/html", html)
+        self.send_response(client_socket, 404, "Not Found", "text/html", NOT_FOUND_HTML,
+                           keep_alive)
 
 def main():
     if len(sys.argv) != 2:
@@ -296,7 +488,11 @@ def main():
         print(f"Error: '{directory}' is not a directory")
         sys.exit(1)
     
-    server = HTTPServer(directory=directory)
+    logging.basicConfig(level=os.environ.get('LAB1_LOG', 'INFO'),
+                        format='%(message)s')
+
+    workers = int(os.environ.get('LAB1_WORKERS', '8'))
+    server = HTTPServer(directory=directory, workers=workers)
     server.start()
 
 if __name__ == "__main__":
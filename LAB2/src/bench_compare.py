@@ -8,45 +8,128 @@ clearly demonstrates the effect of concurrency without hitting the rate limiter.
 """
 
 import argparse
+import asyncio
 import os
 import signal
+import socket
 import subprocess
 import sys
 import time
-import urllib.request
-import concurrent.futures
+import urllib.parse
 
 
-def wait_ready(url: str, timeout: float = 5.0) -> bool:
+def wait_ready(host: str, port: int, timeout: float = 5.0) -> bool:
+    """Poll until the server accepts TCP connections.
+
+    A bare connect is enough to detect readiness and is far cheaper than
+    issuing a full HTTP GET per attempt.
+    """
     start = time.time()
     while time.time() - start < timeout:
         try:
-            with urllib.request.urlopen(url) as resp:
-                return True
-        except Exception:
-            time.sleep(0.1)
+            socket.create_connection((host, port), timeout=0.1).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
     return False
 
 
-def fetch(url: str) -> int:
-    with urllib.request.urlopen(url) as resp:
-        return resp.getcode()
+def split_url(url: str) -> tuple[str, int, str]:
+    parts = urllib.parse.urlsplit(url)
+    return parts.hostname or "localhost", parts.port or 80, parts.path or "/"
 
 
-def run_once(url: str, concurrency: int, requests: int) -> tuple[float, int]:
-    t0 = time.perf_counter()
-    ok = 0
-    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as ex:
-        futs = [ex.submit(fetch, url) for _ in range(requests)]
-        for f in concurrent.futures.as_completed(futs):
+async def fetch(host: str, port: int, path: str) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # drain the body so the server sees a clean close
+        parts = status_line.split(b" ", 2)
+        return int(parts[1]) if len(parts) >= 2 else -1
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def fetch_pipelined(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes) -> int:
+    """Issue one request on an already-open keep-alive connection."""
+    writer.write(request)
+    await writer.drain()
+    header = await reader.readuntil(b"\r\n\r\n")
+    status = int(header.split(b" ", 2)[1])
+    content_length = 0
+    for line in header.split(b"\r\n")[1:]:
+        if line[:15].lower() == b"content-length:":
+            content_length = int(line[15:])
+            break
+    if content_length:
+        await reader.readexactly(content_length)
+    return status
+
+
+async def keepalive_worker(host: str, port: int, request: bytes, count: int, codes: list[int]) -> None:
+    """Run `count` requests, reusing one connection for as long as the
+    server allows and reconnecting when it closes."""
+    reader = writer = None
+    for _ in range(count):
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            codes.append(await fetch_pipelined(reader, writer, request))
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            codes.append(-1)
+    if writer is not None:
+        writer.close()
+
+
+async def _run_once_async(url: str, concurrency: int, requests: int, keepalive: bool = True) -> tuple[float, int]:
+    host, port, path = split_url(url)
+    codes: list[int] = []
+
+    if keepalive:
+        # One persistent connection per in-flight slot: ~concurrency TCP
+        # handshakes total instead of one per request
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n".encode("ascii")
+        )
+        per_worker = [requests // concurrency] * concurrency
+        for i in range(requests % concurrency):
+            per_worker[i] += 1
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            *[keepalive_worker(host, port, request, n, codes) for n in per_worker if n]
+        )
+        return time.perf_counter() - t0, sum(1 for code in codes if code == 200)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded() -> int:
+        async with sem:
             try:
-                if f.result() == 200:
-                    ok += 1
-            except Exception:
-                pass
+                return await fetch(host, port, path)
+            except OSError:
+                return -1
+
+    t0 = time.perf_counter()
+    codes = await asyncio.gather(*[bounded() for _ in range(requests)])
+    ok = sum(1 for code in codes if code == 200)
     return time.perf_counter() - t0, ok
 
 
+def run_once(url: str, concurrency: int, requests: int, keepalive: bool = True) -> tuple[float, int]:
+    return asyncio.run(_run_once_async(url, concurrency, requests, keepalive))
+
+
 def start_server(port: int, workers: int, delay: float, rate_limit: int) -> subprocess.Popen:
     env = os.environ.copy()
     env["LAB2_WORKERS"] = str(workers)
@@ -85,7 +168,7 @@ def main():
     # Single-threaded-ish server (workers=1)
     p1 = start_server(args.port1, 1, args.delay, args.rate_limit)
     url1 = f"http://localhost:{args.port1}/"
-    if not wait_ready(url1):
+    if not wait_ready("localhost", args.port1):
         print(f"ERROR: server workers=1 not ready at {url1}")
         stop_server(p1)
         sys.exit(1)
@@ -93,7 +176,7 @@ def main():
     # Concurrent server (workers=N)
     pN = start_server(args.portN, args.workers, args.delay, args.rate_limit)
     urlN = f"http://localhost:{args.portN}/"
-    if not wait_ready(urlN):
+    if not wait_ready("localhost", args.portN):
         print(f"ERROR: server workers={args.workers} not ready at {urlN}")
         stop_server(p1)
         stop_server(pN)
@@ -1,35 +1,108 @@
 #!/usr/bin/env python3
 """
 Benchmark script for LAB2 concurrent server vs single-threaded.
-- Issues N concurrent GET requests with optional delay on server side.
+- Issues N concurrent GET requests (single-threaded asyncio event loop).
 - Measures total time and 200 OK count.
 - NEW: supports multiple trials and CSV export of results (min/avg/max).
 """
 
 import argparse
-import concurrent.futures
+import asyncio
 import csv
 import statistics
 import time
-import urllib.request
+import urllib.parse
 
 
-def fetch(url: str) -> int:
-    with urllib.request.urlopen(url) as resp:
-        return resp.getcode()
+def split_url(url: str) -> tuple[str, int, str]:
+    parts = urllib.parse.urlsplit(url)
+    return parts.hostname or "localhost", parts.port or 80, parts.path or "/"
 
 
-def run_once(url: str, concurrency: int, requests: int) -> tuple[float, int]:
-    t0 = time.perf_counter()
-    ok = 0
-    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as ex:
-        futs = [ex.submit(fetch, url) for _ in range(requests)]
-        for f in concurrent.futures.as_completed(futs):
+async def fetch(host: str, port: int, path: str) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # drain the body so the server sees a clean close
+        parts = status_line.split(b" ", 2)
+        return int(parts[1]) if len(parts) >= 2 else -1
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def fetch_pipelined(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes) -> int:
+    """Issue one request on an already-open keep-alive connection."""
+    writer.write(request)
+    await writer.drain()
+    header = await reader.readuntil(b"\r\n\r\n")
+    status = int(header.split(b" ", 2)[1])
+    content_length = 0
+    for line in header.split(b"\r\n")[1:]:
+        if line[:15].lower() == b"content-length:":
+            content_length = int(line[15:])
+            break
+    if content_length:
+        await reader.readexactly(content_length)
+    return status
+
+
+async def keepalive_worker(host: str, port: int, request: bytes, count: int, codes: list[int]) -> None:
+    """Run `count` requests, reusing one connection for as long as the
+    server allows and reconnecting when it closes."""
+    reader = writer = None
+    for _ in range(count):
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            codes.append(await fetch_pipelined(reader, writer, request))
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            codes.append(-1)
+    if writer is not None:
+        writer.close()
+
+
+async def run_once(url: str, concurrency: int, requests: int, keepalive: bool = True) -> tuple[float, int]:
+    host, port, path = split_url(url)
+    codes: list[int] = []
+
+    if keepalive:
+        # One persistent connection per in-flight slot: ~concurrency TCP
+        # handshakes total instead of one per request
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n".encode("ascii")
+        )
+        per_worker = [requests // concurrency] * concurrency
+        for i in range(requests % concurrency):
+            per_worker[i] += 1
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            *[keepalive_worker(host, port, request, n, codes) for n in per_worker if n]
+        )
+        return time.perf_counter() - t0, sum(1 for code in codes if code == 200)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded() -> int:
+        async with sem:
             try:
-                if f.result() == 200:
-                    ok += 1
-            except Exception:
-                pass
+                return await fetch(host, port, path)
+            except OSError:
+                return -1
+
+    t0 = time.perf_counter()
+    codes = await asyncio.gather(*[bounded() for _ in range(requests)])
+    ok = sum(1 for code in codes if code == 200)
     return time.perf_counter() - t0, ok
 
 
@@ -40,12 +113,13 @@ def main():
     parser.add_argument("--requests", type=int, default=10)
     parser.add_argument("--trials", type=int, default=1, help="Repeat benchmark this many times")
     parser.add_argument("--csv", type=str, default="", help="Optional CSV output path")
+    parser.add_argument("--no-keepalive", action="store_true", help="Open a fresh TCP connection per request (measures handshakes)")
     args = parser.parse_args()
 
     durations = []
     oks = []
     for i in range(args.trials):
-        dt, ok = run_once(args.url, args.concurrency, args.requests)
+        dt, ok = asyncio.run(run_once(args.url, args.concurrency, args.requests, keepalive=not args.no_keepalive))
         durations.append(dt)
         oks.append(ok)
         print(f"Trial {i+1}/{args.trials}: {args.requests} req @ {args.concurrency} conc -> {dt:.2f}s; 200 OK: {ok}")
@@ -7,6 +7,15 @@ import socket
 import sys
 import os
 
+# Large socket buffers to cover the bandwidth-delay product on fast links
+SOCKET_BUFFER_SIZE = int(os.environ.get('LAB2_SOCKBUF', 4 * 1024 * 1024))
+
+# Request line and headers as one precompiled bytes template
+REQUEST_TEMPLATE = b"GET %s HTTP/1.1\r\nHost: %s:%d\r\nConnection: close\r\n\r\n"
+
+# Wire boundary between the header block and the body
+HEADER_SEP = b'\r\n\r\n'
+
 class HTTPClient:
     def __init__(self):
         self.socket = None
@@ -14,29 +23,34 @@ class HTTPClient:
     def request(self, host, port, path, save_directory):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.socket.connect((host, port))
-            request = f"GET {path} HTTP/1.1\r\n"
-            request += f"Host: {host}:{port}\r\n"
-            request += "Connection: close\r\n\r\n"
-            self.socket.send(request.encode('utf-8'))
-            response_data = b""
+            self.socket.sendall(REQUEST_TEMPLATE % (path.encode('utf-8'), host.encode('ascii'), port))
+            # Receive into one growable buffer instead of `+=` reallocations
+            buf = bytearray(65536)
+            pos = 0
             while True:
-                data = self.socket.recv(4096)
-                if not data:
+                n = self.socket.recv_into(memoryview(buf)[pos:])
+                if not n:
                     break
-                response_data += data
-            self.parse_response(response_data, path, save_directory)
+                pos += n
+                if pos == len(buf):
+                    buf.extend(b"\x00" * len(buf))
+            del buf[pos:]
+            self.parse_response(buf, path, save_directory)
         finally:
             if self.socket:
                 self.socket.close()
 
     def parse_response(self, response_data, path, save_directory):
-        header_end = response_data.find(b'\r\n\r\n')
+        header_end = response_data.find(HEADER_SEP)
         if header_end == -1:
             print("Invalid HTTP response")
             return
-        headers = response_data[:header_end].decode('utf-8', errors='ignore')
-        body = response_data[header_end + 4:]
+        headers = bytes(response_data[:header_end]).decode('utf-8', errors='ignore')
+        body = memoryview(response_data)[header_end + len(HEADER_SEP):]
         status_line = headers.split('\r\n')[0]
         status_code = int(status_line.split(' ')[1])
         content_type = 'text/plain'
@@ -46,10 +60,10 @@ class HTTPClient:
                 break
         if status_code != 200:
             print(headers)
-            print(body.decode('utf-8', errors='ignore'))
+            print(str(body, 'utf-8', 'ignore'))
             return
         if content_type.startswith('text/html'):
-            print(body.decode('utf-8', errors='ignore'))
+            print(str(body, 'utf-8', 'ignore'))
         else:
             filename = os.path.basename(path) or 'download'
             os.makedirs(save_directory, exist_ok=True)
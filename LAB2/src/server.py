@@ -12,15 +12,57 @@ Features:
 
 import argparse
 import os
+import selectors
 import socket
 import sys
 import threading
 import time
 import urllib.parse
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Files up to this size are cached in memory and sent with sendall;
+# larger files stream straight from the page cache via sendfile(2).
+FILE_CACHE_MAX_FILE = 1024 * 1024
+# Total bytes the hot-file cache may hold before LRU eviction kicks in
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Constant response-header tail, pre-encoded once at import. Only the
+# status line, Content-Type and Content-Length vary per response.
+_HDR_TAIL_KEEPALIVE = (
+    b"\r\nConnection: keep-alive"
+    b"\r\nServer: Python HTTP File Server (LAB2)"
+    b"\r\nAccess-Control-Allow-Origin: *"
+    b"\r\nAccess-Control-Allow-Methods: GET, HEAD, OPTIONS"
+    b"\r\nAccess-Control-Allow-Headers: Content-Type"
+    b"\r\n\r\n"
+)
+_HDR_TAIL_CLOSE = _HDR_TAIL_KEEPALIVE.replace(b"keep-alive", b"close", 1)
+
+# Static listing chrome, encoded once at import. Only the title/heading
+# and the rows vary per directory.
+_LISTING_PREFIX = b"""<!DOCTYPE html>
+<html>
+<head>
+  <style>
+    body { font-family: Arial, sans-serif; margin: 40px; }
+    table { border-collapse: collapse; width: 100%; }
+    th, td { text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }
+    th { background-color: #f2f2f2; }
+    .size { text-align: right; }
+    .date { white-space: nowrap; }
+    .hits { text-align: right; }
+  </style>
+"""
+
+_LISTING_SUFFIX = b"""
+    </table>
+    <hr>
+    <p><em>Python Concurrent HTTP File Server (LAB2)</em></p>
+  </body>
+</html>"""
+
 
 class HTTPServer:
     def __init__(
@@ -34,6 +76,7 @@ class HTTPServer:
         naive_interleave_ms: int = 0,
         rate_limit: int = 5,
         rate_window: float = 1.0,
+        keepalive_timeout: float = 5.0,
     ) -> None:
         self.host = host
         self.port = port
@@ -44,17 +87,32 @@ class HTTPServer:
         self.naive_interleave_ms = max(0, int(naive_interleave_ms))
         self.rate_limit = max(1, int(rate_limit))
         self.rate_window = float(rate_window)
+        self.keepalive_timeout = float(keepalive_timeout)
 
         self.socket = None
         self.executor: ThreadPoolExecutor | None = None
 
-        # Request counters and synchronization
+        # Request counters. Naive mode keeps the single unlocked dict to
+        # demonstrate the race; locked mode stripes the counts across
+        # independent (dict, lock) pairs chosen by path hash so workers
+        # rarely contend on the same mutex. Power-of-two stripe count
+        # lets a mask replace the modulo.
         self.request_counts: dict[str, int] = defaultdict(int)
-        self.count_lock = threading.Lock()
-
-        # Rate limiting: per-IP timestamp deque
-        self.rate_map: dict[str, deque] = defaultdict(deque)
-        self.rate_lock = threading.Lock()
+        n_stripes = 1 << (max(16, 2 * self.workers) - 1).bit_length()
+        self._count_stripes = [(defaultdict(int), threading.Lock()) for _ in range(n_stripes)]
+        self._count_mask = n_stripes - 1
+
+        # Rate limiting: token bucket per IP as a [tokens, last_refill]
+        # pair, sharded across 32 (dict, lock) stripes by IP hash. O(1)
+        # per check with no deque allocation or timestamp scan.
+        self._rate_stripes = [({}, threading.Lock()) for _ in range(32)]
+
+        # Hot-file cache: path -> (mtime, size, content, content_type).
+        # Repeat hits on small static files become a dict lookup plus a
+        # sendall instead of open/read/close per request.
+        self._file_cache: OrderedDict[str, tuple[float, int, bytes, bytes]] = OrderedDict()
+        self._file_cache_bytes = 0
+        self._file_cache_lock = threading.Lock()
 
         self.mime_types = {
             ".html": "text/html",
@@ -68,6 +126,9 @@ class HTTPServer:
             ".js": "application/javascript",
             ".txt": "text/plain",
         }
+        # Pre-encoded values so the response path never re-encodes a
+        # constant content type
+        self._mime_bytes = {ext: v.encode("ascii") for ext, v in self.mime_types.items()}
 
     # ---------------------- Concurrency & Lifecycle ---------------------- #
     def start(self) -> None:
@@ -76,6 +137,7 @@ class HTTPServer:
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.bind((self.host, self.port))
         self.socket.listen(128)
+        self.socket.setblocking(False)
 
         print(f"[LAB2] Concurrent server at http://{self.host}:{self.port}")
         print(f"Serving directory: {self.directory}")
@@ -85,90 +147,234 @@ class HTTPServer:
         print("Press Ctrl+C to stop the server")
 
         self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        # Reaper keeps the per-IP limiter map bounded under IP churn;
+        # cleanup runs here instead of on the request path
+        threading.Thread(target=self._reap_rate_map, daemon=True).start()
+
+        # Reactor: one selector loop owns accept and request reads, so a
+        # connection only occupies a pool thread once a full request has
+        # arrived. Workers hand keep-alive sockets back through the
+        # self-pipe so re-registration never races the select() call.
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self.socket, selectors.EVENT_READ, self._accept)
+        self._waker_r, self._waker_w = socket.socketpair()
+        self._waker_r.setblocking(False)
+        self._sel.register(self._waker_r, selectors.EVENT_READ, self._drain_waker)
+        self._rearm: deque = deque()
+        self._rearm_lock = threading.Lock()
+        # sock -> [ip, buffer, last_active, watched_by_reactor]
+        self._conn_meta: dict = {}
+        self._last_sweep = time.monotonic()
+
         try:
             while True:
-                client_socket, client_addr = self.socket.accept()
-                # Submit each connection to the pool
-                self.executor.submit(self._handle_connection, client_socket, client_addr)
+                for key, _ in self._sel.select(timeout=1.0):
+                    key.data(key.fileobj)
+                self._sweep_idle()
         except KeyboardInterrupt:
             print("\n[LAB2] Shutting down...")
         finally:
             if self.executor:
                 self.executor.shutdown(wait=True, cancel_futures=True)
+            self._sel.close()
+            self._waker_r.close()
+            self._waker_w.close()
             if self.socket:
                 self.socket.close()
 
-    # --------------------------- Core Handling --------------------------- #
-    def _handle_connection(self, client_socket: socket.socket, client_addr) -> None:
-        try:
-            # Rate limiting check first (based on remote IP)
-            ip = client_addr[0]
-            if not self._check_rate_limit(ip):
-                self.send_response(client_socket, 429, "Too Many Requests", "text/plain", "Rate limit exceeded")
-                return
-
-            # Read request
-            request_data = client_socket.recv(2048).decode("utf-8", errors="ignore")
-            if not request_data:
-                return
-
-            request_line = request_data.split("\r\n", 1)[0]
-            parts = request_line.split()
-            if len(parts) < 3:
-                self.send_response(client_socket, 400, "Bad Request", "text/plain")
-                return
-
-            method, path, _ = parts
-
-            # Optional artificial delay to simulate work
-            if self.simulate_delay > 0:
-                time.sleep(self.simulate_delay)
-
-            # Handle CORS preflight quickly
-            if method == "OPTIONS":
-                self.send_response(client_socket, 200, "OK", "text/plain", "")
+    # --------------------------- Reactor Loop ---------------------------- #
+    def _accept(self, listen_sock: socket.socket) -> None:
+        while True:
+            try:
+                client, addr = listen_sock.accept()
+            except BlockingIOError:
                 return
-
-            if method != "GET":
-                self.send_response(client_socket, 405, "Method Not Allowed", "text/plain")
+            except OSError:
                 return
+            client.setblocking(False)
+            self._conn_meta[client] = [addr[0], bytearray(), time.monotonic(), True]
+            self._sel.register(client, selectors.EVENT_READ, self._read_request)
+
+    def _read_request(self, client: socket.socket) -> None:
+        meta = self._conn_meta.get(client)
+        if meta is None:
+            self._drop(client)
+            return
+        try:
+            data = client.recv(2048)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._drop(client)
+            return
+        if not data:
+            self._drop(client)
+            return
 
-            # Decode and normalize path
-            url_path = urllib.parse.unquote(path.split("?", 1)[0])
-            if ".." in url_path:
-                self.send_response(client_socket, 403, "Forbidden", "text/plain")
-                return
+        buf = meta[1]
+        buf += data
+        meta[2] = time.monotonic()
+        if b"\r\n\r\n" in buf or len(buf) >= 2048:
+            self._dispatch(client, meta)
+
+    def _dispatch(self, client: socket.socket, meta: list) -> None:
+        # Full header in hand: stop watching the fd and give the request
+        # to the pool. The response path (which may sleep or sendfile)
+        # runs blocking with a timeout. Bytes beyond this request's
+        # terminator stay buffered - a pipelining client may already
+        # have sent the next request.
+        buf = meta[1]
+        head = buf.find(b"\r\n\r\n")
+        consumed = head + 4 if head != -1 else len(buf)
+        request = bytes(buf[:consumed])
+        del buf[:consumed]
+        meta[3] = False
+        try:
+            self._sel.unregister(client)
+        except (KeyError, ValueError):
+            pass
+        client.settimeout(self.keepalive_timeout)
+        self.executor.submit(self._respond, client, meta[0], request)
 
-            # Count the request for this path (demonstrates race if naive)
-            self._increment_counter(url_path)
+    def _drain_waker(self, waker: socket.socket) -> None:
+        try:
+            waker.recv(4096)
+        except (BlockingIOError, OSError):
+            pass
+        with self._rearm_lock:
+            socks = list(self._rearm)
+            self._rearm.clear()
+        for client in socks:
+            meta = self._conn_meta.get(client)
+            if meta is None:
+                continue
+            meta[2] = time.monotonic()
+            if b"\r\n\r\n" in meta[1] or len(meta[1]) >= 2048:
+                # The next pipelined request is already buffered; serve
+                # it now instead of waiting on a read that may never fire
+                self._dispatch(client, meta)
+                continue
+            meta[3] = True
+            try:
+                client.setblocking(False)
+                self._sel.register(client, selectors.EVENT_READ, self._read_request)
+            except (OSError, ValueError):
+                self._drop(client)
 
-            # Map to filesystem
-            if url_path == "/":
-                file_path = self.directory
-            else:
-                file_path = os.path.join(self.directory, url_path.lstrip("/"))
-            file_path = os.path.normpath(file_path)
-            if not file_path.startswith(self.directory):
-                self.send_response(client_socket, 403, "Forbidden", "text/plain")
-                return
+    def _sweep_idle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < 1.0:
+            return
+        self._last_sweep = now
+        for client, meta in list(self._conn_meta.items()):
+            # Only reap sockets the reactor currently owns; ones handed
+            # to a worker are bounded by their own socket timeout
+            if meta[3] and now - meta[2] > self.keepalive_timeout:
+                self._drop(client)
+
+    def _drop(self, client: socket.socket) -> None:
+        self._conn_meta.pop(client, None)
+        try:
+            self._sel.unregister(client)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client.close()
+        except OSError:
+            pass
 
-            if os.path.isfile(file_path):
-                self._serve_file(client_socket, file_path)
-            elif os.path.isdir(file_path):
-                self._serve_directory(client_socket, file_path, url_path)
+    # --------------------------- Core Handling --------------------------- #
+    def _respond(self, client_socket: socket.socket, ip: str, data: bytes) -> None:
+        """Handle one parsed-enough request on a pool thread."""
+        keep_alive = False
+        try:
+            # Rate limiting check per request (based on remote IP)
+            if not self._check_rate_limit(ip):
+                self.send_response(client_socket, 429, "Too Many Requests", "text/plain", "Rate limit exceeded")
             else:
-                self._send_404(client_socket)
-        except Exception as e:
+                eol = data.find(b"\r\n")
+                parts = data[: eol if eol != -1 else len(data)].split(b" ", 2)
+                if len(parts) < 3:
+                    self.send_response(client_socket, 400, "Bad Request", "text/plain")
+                else:
+                    method_b, path_b, version_b = parts
+
+                    # HTTP/1.1 defaults to keep-alive unless the client opts out
+                    conn_header = b""
+                    head_end = data.find(b"\r\n\r\n")
+                    header_block = data[eol + 2 : head_end if head_end != -1 else len(data)]
+                    for line in header_block.split(b"\r\n"):
+                        if line[:11].lower() == b"connection:":
+                            conn_header = line[11:].strip().lower()
+                            break
+                    if version_b == b"HTTP/1.1":
+                        keep_alive = conn_header != b"close"
+                    else:
+                        keep_alive = conn_header == b"keep-alive"
+
+                    method = method_b.decode("ascii", errors="ignore")
+                    path = path_b.split(b"?", 1)[0].decode("ascii", errors="ignore")
+
+                    self._handle_request(client_socket, method, path, keep_alive)
+        except Exception:
             # Avoid crashing a worker
+            keep_alive = False
             try:
                 self.send_response(client_socket, 500, "Internal Server Error", "text/plain")
             except Exception:
                 pass
-        finally:
+
+        if keep_alive:
+            # Give the socket back to the reactor to await the next request
+            with self._rearm_lock:
+                self._rearm.append(client_socket)
             try:
-                client_socket.close()
-            except Exception:
+                self._waker_w.send(b"x")
+            except OSError:
                 pass
+        else:
+            self._drop(client_socket)
+
+    def _handle_request(self, client_socket: socket.socket, method: str, path: str, keep_alive: bool) -> None:
+        # Optional artificial delay to simulate work
+        if self.simulate_delay > 0:
+            time.sleep(self.simulate_delay)
+
+        # Handle CORS preflight quickly
+        if method == "OPTIONS":
+            self.send_response(client_socket, 200, "OK", "text/plain", "", keep_alive=keep_alive)
+            return
+
+        if method != "GET":
+            self.send_response(client_socket, 405, "Method Not Allowed", "text/plain", keep_alive=keep_alive)
+            return
+
+        # Decode and normalize path
+        url_path = urllib.parse.unquote(path.split("?", 1)[0])
+        if ".." in url_path:
+            self.send_response(client_socket, 403, "Forbidden", "text/plain", keep_alive=keep_alive)
+            return
+
+        # Count the request for this path (demonstrates race if naive)
+        self._increment_counter(url_path)
+
+        # Map to filesystem
+        if url_path == "/":
+            file_path = self.directory
+        else:
+            file_path = os.path.join(self.directory, url_path.lstrip("/"))
+        file_path = os.path.normpath(file_path)
+        if not file_path.startswith(self.directory):
+            self.send_response(client_socket, 403, "Forbidden", "text/plain", keep_alive=keep_alive)
+            return
+
+        if os.path.isfile(file_path):
+            self._serve_file(client_socket, file_path, keep_alive)
+        elif os.path.isdir(file_path):
+            self._serve_directory(client_socket, file_path, url_path, keep_alive)
+        else:
+            self._send_404(client_socket, keep_alive)
 
     # ---------------------- Counters & Rate Limiting --------------------- #
     def _increment_counter(self, path: str) -> None:
@@ -180,102 +386,144 @@ class HTTPServer:
             self.request_counts[path] = current + 1
             return
 
-        # Locked mode
-        with self.count_lock:
-            self.request_counts[path] += 1
+        # Locked mode: only requests hashing to the same stripe contend
+        counts, lock = self._count_stripes[hash(path) & self._count_mask]
+        with lock:
+            counts[path] += 1
 
     def _get_count(self, path: str) -> int:
-        # Reading without lock is OK for ints in CPython for visibility in practice,
-        # but we can still guard it to be precise.
-        with self.count_lock:
+        if self.counter_mode == "naive":
             return int(self.request_counts.get(path, 0))
+        counts, lock = self._count_stripes[hash(path) & self._count_mask]
+        with lock:
+            return int(counts.get(path, 0))
 
     def _check_rate_limit(self, ip: str) -> bool:
         now = time.monotonic()
-        with self.rate_lock:
-            dq = self.rate_map[ip]
-            # Drop old timestamps
-            window_start = now - self.rate_window
-            while dq and dq[0] < window_start:
-                dq.popleft()
-            if len(dq) >= self.rate_limit:
-                return False
-            dq.append(now)
-            return True
+        rate_map, lock = self._rate_stripes[hash(ip) & 31]
+        with lock:
+            entry = rate_map.get(ip)
+            if entry is None:
+                entry = rate_map[ip] = [float(self.rate_limit), now]
+            else:
+                # Refill tokens for the elapsed time, capped at the burst size
+                entry[0] = min(
+                    float(self.rate_limit),
+                    entry[0] + (now - entry[1]) * (self.rate_limit / self.rate_window),
+                )
+                entry[1] = now
+            if entry[0] >= 1.0:
+                entry[0] -= 1.0
+                return True
+            return False
+
+    def _reap_rate_map(self) -> None:
+        """Drop IPs idle for a full rate window so the limiter map stays
+        bounded under long runs with many unique clients."""
+        while True:
+            time.sleep(self.rate_window)
+            cutoff = time.monotonic() - self.rate_window
+            for bucket, lock in self._rate_stripes:
+                with lock:
+                    stale = [ip for ip, entry in bucket.items() if entry[1] < cutoff]
+                    for ip in stale:
+                        del bucket[ip]
 
     # ---------------------------- Responders ----------------------------- #
-    def _serve_file(self, client_socket: socket.socket, file_path: str) -> None:
+    def _serve_file(self, client_socket: socket.socket, file_path: str, keep_alive: bool = False) -> None:
         try:
-            with open(file_path, "rb") as f:
-                content = f.read()
             _, ext = os.path.splitext(file_path)
-            content_type = self.mime_types.get(ext.lower(), "application/octet-stream")
-            self.send_response(client_socket, 200, "OK", content_type, content)
+            content_type = self._mime_bytes.get(ext.lower(), b"application/octet-stream")
+            st = os.stat(file_path)
+
+            if st.st_size > FILE_CACHE_MAX_FILE:
+                # Large files: headers first, then the body straight from
+                # the page cache via sendfile(2) - no userspace copy and
+                # no whole-file bytes object per request
+                with open(file_path, "rb") as f:
+                    client_socket.sendall(self._build_headers(200, "OK", content_type, st.st_size, keep_alive))
+                    client_socket.sendfile(f)
+                return
+
+            # Small files: serve from the LRU cache keyed by mtime+size
+            with self._file_cache_lock:
+                cached = self._file_cache.get(file_path)
+                if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+                    self._file_cache.move_to_end(file_path)
+                    content = cached[2]
+                else:
+                    content = None
+
+            if content is None:
+                with open(file_path, "rb") as f:
+                    content = f.read()
+                with self._file_cache_lock:
+                    stale = self._file_cache.pop(file_path, None)
+                    if stale:
+                        self._file_cache_bytes -= stale[1]
+                    self._file_cache[file_path] = (st.st_mtime, st.st_size, content, content_type)
+                    self._file_cache_bytes += st.st_size
+                    while self._file_cache_bytes > FILE_CACHE_MAX_BYTES:
+                        _, evicted = self._file_cache.popitem(last=False)
+                        self._file_cache_bytes -= evicted[1]
+
+            self.send_response(client_socket, 200, "OK", content_type, content, keep_alive=keep_alive)
         except OSError:
-            self._send_404(client_socket)
+            self._send_404(client_socket, keep_alive)
 
-    def _serve_directory(self, client_socket: socket.socket, dir_path: str, url_path: str) -> None:
+    def _serve_directory(self, client_socket: socket.socket, dir_path: str, url_path: str, keep_alive: bool = False) -> None:
         try:
-            items = os.listdir(dir_path)
-            items.sort()
-            html = self._generate_directory_listing(items, dir_path, url_path)
-            self.send_response(client_socket, 200, "OK", "text/html", html.encode("utf-8"))
+            # One scandir pass; each DirEntry caches its stat result, so
+            # the listing costs one syscall per entry instead of three
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+            html = self._generate_directory_listing(entries, url_path)
+            self.send_response(client_socket, 200, "OK", "text/html", html, keep_alive=keep_alive)
         except OSError:
-            self._send_404(client_socket)
+            self._send_404(client_socket, keep_alive)
 
-    def _generate_directory_listing(self, items: list[str], dir_path: str, url_path: str) -> str:
+    def _generate_directory_listing(self, entries: list[os.DirEntry], url_path: str) -> bytes:
         if not url_path.endswith("/"):
             url_path = url_path + "/"
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-  <title>Directory listing for {url_path}</title>
-  <style>
-    body {{ font-family: Arial, sans-serif; margin: 40px; }}
-    table {{ border-collapse: collapse; width: 100%; }}
-    th, td {{ text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }}
-    th {{ background-color: #f2f2f2; }}
-    .size {{ text-align: right; }}
-    .date {{ white-space: nowrap; }}
-    .hits {{ text-align: right; }}
-  </style>
+        # Accumulate encoded fragments and join once: O(n) instead of the
+        # O(n^2) of repeated str concatenation, and no final encode pass
+        parts = [_LISTING_PREFIX]
+        parts.append(
+            f"""  <title>Directory listing for {url_path}</title>
   </head>
   <body>
     <h1>Directory listing for {url_path}</h1>
     <hr>
     <table>
-      <tr><th>Name</th><th class=\"size\">Size</th><th class=\"date\">Last Modified</th><th class=\"hits\">Hits</th></tr>"""
+      <tr><th>Name</th><th class="size">Size</th><th class="date">Last Modified</th><th class="hits">Hits</th></tr>""".encode("utf-8")
+        )
 
         # Parent directory link
         if url_path != "/":
             parent_parts = url_path.rstrip("/").split("/")
             parent_path = "/" if len(parent_parts) <= 1 else "/".join(parent_parts[:-1]) + "/"
             parent_hits = self._get_count(parent_path)
-            html += f"\n      <tr><td><a href=\"{parent_path}\">../</a></td><td class=\"size\">-</td><td class=\"date\">-</td><td class=\"hits\">{parent_hits}</td></tr>"
+            parts.append(f"\n      <tr><td><a href=\"{parent_path}\">../</a></td><td class=\"size\">-</td><td class=\"date\">-</td><td class=\"hits\">{parent_hits}</td></tr>".encode("utf-8"))
 
-        for item in items:
-            item_fs_path = os.path.join(dir_path, item)
-            item_url = url_path + urllib.parse.quote(item)
-            if os.path.isdir(item_fs_path):
-                name = item + "/"
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                st = None
+            item_url = url_path + urllib.parse.quote(entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                name = entry.name + "/"
                 size = "-"
                 item_url += "/"
             else:
-                name = item
-                try:
-                    size = self._format_size(os.path.getsize(item_fs_path))
-                except OSError:
-                    size = "-"
-            try:
-                mtime = os.path.getmtime(item_fs_path)
-                date = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
-            except OSError:
-                date = "-"
+                name = entry.name
+                size = self._format_size(st.st_size) if st else "-"
+            date = datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S") if st else "-"
             hits = self._get_count(item_url)
-            html += f"\n      <tr><td><a href=\"{item_url}\">{name}</a></td><td class=\"size\">{size}</td><td class=\"date\">{date}</td><td class=\"hits\">{hits}</td></tr>"
+            parts.append(f"\n      <tr><td><a href=\"{item_url}\">{name}</a></td><td class=\"size\">{size}</td><td class=\"date\">{date}</td><td class=\"hits\">{hits}</td></tr>".encode("utf-8"))
 
-        html += "\n    </table>\n    <hr>\n    <p><em>Python Concurrent HTTP File Server (LAB2)</em></p>\n  </body>\n</html>"
-        return html
+        parts.append(_LISTING_SUFFIX)
+        return b"".join(parts)
 
     def _format_size(self, size: int) -> str:
         for unit in ["B", "KB", "MB", "GB"]:
@@ -284,32 +532,37 @@ class HTTPServer:
             size /= 1024.0
         return f"{size:.1f}TB"
 
-    def send_response(self, client_socket: socket.socket, status_code: int, status_text: str, content_type: str, content=None) -> None:
+    def _build_headers(self, status_code: int, status_text: str, content_type, content_length: int, keep_alive: bool) -> bytes:
+        # Only the first three header lines vary; everything after them
+        # is one of two pre-encoded byte strings
+        if isinstance(content_type, str):
+            content_type = content_type.encode("ascii")
+        head = f"HTTP/1.1 {status_code} {status_text}\r\nContent-Type: ".encode("ascii")
+        length = f"\r\nContent-Length: {content_length}".encode("ascii")
+        return head + content_type + length + (_HDR_TAIL_KEEPALIVE if keep_alive else _HDR_TAIL_CLOSE)
+
+    def send_response(self, client_socket: socket.socket, status_code: int, status_text: str, content_type: str, content=None, keep_alive: bool = False) -> None:
         if content is None:
             content = status_text.encode("utf-8")
         elif isinstance(content, str):
             content = content.encode("utf-8")
 
-        headers = [
-            f"HTTP/1.1 {status_code} {status_text}",
-            f"Content-Type: {content_type}",
-            f"Content-Length: {len(content)}",
-            "Server: Python HTTP File Server (LAB2)",
-            "Access-Control-Allow-Origin: *",
-            "Access-Control-Allow-Methods: GET, HEAD, OPTIONS",
-            "Access-Control-Allow-Headers: Content-Type",
-            "",
-            "",
-        ]
-        client_socket.send("\r\n".join(headers).encode("utf-8"))
-        client_socket.send(content)
-
-    def _send_404(self, client_socket: socket.socket) -> None:
+        header_bytes = self._build_headers(status_code, status_text, content_type, len(content), keep_alive)
+        if len(content) < 64 * 1024:
+            # One syscall for the whole response; two bare send() calls
+            # doubled the syscall count and could short-write
+            client_socket.sendall(header_bytes + content)
+        else:
+            # Avoid copying a large body just to prepend the headers
+            client_socket.sendall(header_bytes)
+            client_socket.sendall(content)
+
+    def _send_404(self, client_socket: socket.socket, keep_alive: bool = False) -> None:
         html = (
             "<!DOCTYPE html><html><head><title>404 Not Found</title></head>"
             "<body><h1>404 - File Not Found</h1></body></html>"
         )
-        self.send_response(client_socket, 404, "Not Found", "text/html", html)
+        self.send_response(client_socket, 404, "Not Found", "text/html", html, keep_alive=keep_alive)
 
 
 def parse_args(argv: list[str]) -> argparse.Namespace:
@@ -323,6 +576,7 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     parser.add_argument("--naive-interleave-ms", type=int, default=int(os.getenv("LAB2_NAIVE_INTERLEAVE_MS", "0")), help="Extra sleep in naive increment to expose race conditions")
     parser.add_argument("--rate-limit", type=int, default=int(os.getenv("LAB2_RATE_LIMIT", "5")))
     parser.add_argument("--rate-window", type=float, default=float(os.getenv("LAB2_RATE_WINDOW", "1.0")))
+    parser.add_argument("--keepalive-timeout", type=float, default=float(os.getenv("LAB2_KEEPALIVE_TIMEOUT", "5.0")), help="Idle timeout (seconds) for keep-alive connections")
     return parser.parse_args(argv)
 
 
@@ -342,6 +596,7 @@ def main() -> None:
         naive_interleave_ms=args.naive_interleave_ms,
         rate_limit=args.rate_limit,
         rate_window=args.rate_window,
+        keepalive_timeout=args.keepalive_timeout,
     )
     server.start()
 
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import sys
 from concurrent.futures import ThreadPoolExecutor
@@ -7,31 +8,39 @@ from concurrent.futures import ThreadPoolExecutor
 LEADER_URL = "http://localhost:8000"
 FOLLOWER_URLS = [f"http://localhost:{8001 + i}" for i in range(5)]
 
+# Shared keep-alive session so repeated requests reuse pooled sockets
+# instead of reconnecting each time
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
+def _probe(health_url):
+    try:
+        return SESSION.get(health_url, timeout=2).status_code == 200
+    except Exception:
+        return False
+
+
 def wait_for_services(timeout=60):
     """Wait for all services to be healthy."""
     print("Waiting for services to start...")
     start_time = time.time()
-    
-    all_urls = [LEADER_URL] + FOLLOWER_URLS
-    
-    while time.time() - start_time < timeout:
-        all_healthy = True
-        for url in all_urls:
-            try:
-                response = requests.get(f"{url}/health", timeout=2)
-                if response.status_code != 200:
-                    all_healthy = False
-                    break
-            except Exception:
-                all_healthy = False
-                break
-        
-        if all_healthy:
-            print("All services are healthy!")
-            return True
-        
-        time.sleep(2)
-    
+
+    # Build the probe URLs once rather than formatting them every poll
+    health_urls = [f"{url}/health" for url in [LEADER_URL] + FOLLOWER_URLS]
+
+    # Probe all services concurrently: one poll costs the slowest check,
+    # not the sum of six timeouts
+    # Adaptive backoff: poll quickly at first so a fast startup is
+    # detected almost immediately, then ease off up to 2s
+    backoff = 0.1
+    with ThreadPoolExecutor(max_workers=len(health_urls)) as executor:
+        while time.time() - start_time < timeout:
+            if all(executor.map(_probe, health_urls)):
+                print("All services are healthy!")
+                return True
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 2.0)
+
     print("Timeout waiting for services to start")
     return False
 
@@ -41,7 +50,7 @@ def test_write_and_read():
     print("\n=== Test 1: Basic Write and Read ===")
     
     # Write a key-value pair
-    response = requests.post(f"{LEADER_URL}/write", json={"key": "test_key", "value": "test_value"})
+    response = SESSION.post(f"{LEADER_URL}/write", json={"key": "test_key", "value": "test_value"})
     assert response.status_code == 200, f"Write failed: {response.text}"
     print("✓ Write successful")
     
@@ -49,14 +58,14 @@ def test_write_and_read():
     time.sleep(1)
     
     # Read from leader
-    response = requests.get(f"{LEADER_URL}/read", params={"key": "test_key"})
+    response = SESSION.get(f"{LEADER_URL}/read", params={"key": "test_key"})
     assert response.status_code == 200, f"Read from leader failed: {response.text}"
     assert response.json()["value"] == "test_value", "Value mismatch on leader"
     print("✓ Read from leader successful")
     
     # Read from followers
     for i, follower_url in enumerate(FOLLOWER_URLS):
-        response = requests.get(f"{follower_url}/read", params={"key": "test_key"})
+        response = SESSION.get(f"{follower_url}/read", params={"key": "test_key"})
         assert response.status_code == 200, f"Read from follower {i+1} failed: {response.text}"
         assert response.json()["value"] == "test_value", f"Value mismatch on follower {i+1}"
     print("✓ Read from all followers successful")
@@ -67,7 +76,7 @@ def test_concurrent_writes():
     print("\n=== Test 2: Concurrent Writes ===")
     
     def write_key(i):
-        response = requests.post(f"{LEADER_URL}/write", json={"key": f"key_{i}", "value": f"value_{i}"})
+        response = SESSION.post(f"{LEADER_URL}/write", json={"key": f"key_{i}", "value": f"value_{i}"})
         return response.status_code == 200
     
     num_writes = 100
@@ -86,19 +95,25 @@ def test_replication_consistency():
     """Test that data is consistent across leader and followers."""
     print("\n=== Test 3: Replication Consistency ===")
     
-    # Get all data from the leader
-    response = requests.get(f"{LEADER_URL}/data")
-    leader_data = response.json()
+    # Fetch the leader and follower snapshots concurrently
+    def get_all_data(url):
+        return SESSION.get(f"{url}/data").json()
+
+    with ThreadPoolExecutor(max_workers=len(FOLLOWER_URLS) + 1) as executor:
+        leader_data, *follower_snapshots = executor.map(
+            get_all_data, [LEADER_URL] + FOLLOWER_URLS
+        )
     print(f"Leader has {len(leader_data)} keys")
-    
+
+    # Hash the leader's keys once for all five follower comparisons
+    leader_keys = set(leader_data)
+
     # Check each follower
-    for i, follower_url in enumerate(FOLLOWER_URLS):
-        response = requests.get(f"{follower_url}/data")
-        follower_data = response.json()
+    for i, follower_data in enumerate(follower_snapshots):
         print(f"Follower {i+1} has {len(follower_data)} keys")
-        
+
         # Check if the follower has at least the data (might have more due to async nature)
-        missing_keys = set(leader_data.keys()) - set(follower_data.keys())
+        missing_keys = leader_keys - follower_data.keys()
         if missing_keys:
             print(f"  ⚠ Follower {i+1} is missing {len(missing_keys)} keys")
         else:
@@ -117,12 +132,12 @@ def test_write_with_concurrent_reads():
     
     def write_keys():
         for i in range(50):
-            requests.post(f"{LEADER_URL}/write", json={"key": f"rw_key_{i}", "value": f"value_{i}"})
+            SESSION.post(f"{LEADER_URL}/write", json={"key": f"rw_key_{i}", "value": f"value_{i}"})
     
     def read_keys():
         for i in range(50):
             try:
-                requests.get(f"{LEADER_URL}/read", params={"key": f"rw_key_{i}"})
+                SESSION.get(f"{LEADER_URL}/read", params={"key": f"rw_key_{i}"})
             except Exception:
                 pass  # Key might not exist yet
     
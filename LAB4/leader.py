@@ -1,144 +1,295 @@
+import asyncio
+import atexit
+import itertools
 import os
 import signal
 import sys
 import time
 import random
-import requests
-from flask import Flask, request, jsonify
-from threading import Lock, Thread
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
+import orjson
+from flask import Flask, request, Response
+from threading import Event, Lock, Thread
 import logging
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def ojson(obj, status=200):
+    """JSON response via orjson - much faster than jsonify for dict payloads."""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
 # In-memory key-value store with versioning {key: {"value": value, "version": version_number}}
+# Copy-on-write: writers build a new dict under store_lock and rebind the
+# name atomically; readers just dereference the current snapshot, so the
+# read path never takes a lock.
 data_store = {}
 store_lock = Lock()
 
-# Global version counter (Lamport timestamp)
-version_counter = 0
-version_lock = Lock()
+# Global version counter (Lamport timestamp). itertools.count.__next__
+# executes atomically in C, so no lock is needed around the increment.
+next_version = itertools.count(1).__next__
 
 # Configuration from env variables
 WRITE_QUORUM = int(os.getenv('WRITE_QUORUM', 3))
 MIN_DELAY = float(os.getenv('MIN_DELAY', 0.0001))  # 500ms, 0.0001 for 0.1ms
 MAX_DELAY = float(os.getenv('MAX_DELAY', 1))   # 1000ms
 PORT = int(os.getenv('PORT', 5000))
+# Simulated replication lag is for the lab harness; set SIMULATE_DELAY=0
+# to run the write path without the artificial sleep
+SIMULATE_DELAY = os.getenv('SIMULATE_DELAY', '1') == '1'
+_DELAY_SPAN = MAX_DELAY - MIN_DELAY
+# Micro-batch window: writes arriving within this many milliseconds are
+# coalesced into one /replicate_batch POST per follower
+BATCH_WINDOW_MS = float(os.getenv('BATCH_WINDOW_MS', 2))
 
 # Follower nodes
 FOLLOWERS = [
     f"http://follower{i}:5000" for i in range(1, 6)
 ]
 
-logger.info(f"Leader starting with WRITE_QUORUM={WRITE_QUORUM}, MIN_DELAY={MIN_DELAY}, MAX_DELAY={MAX_DELAY}")
+logger.info(f"Leader starting with WRITE_QUORUM={WRITE_QUORUM}, MIN_DELAY={MIN_DELAY}, MAX_DELAY={MAX_DELAY}, "
+            f"SIMULATE_DELAY={SIMULATE_DELAY}")
 
+# Replication runs on one background event loop: the follower POSTs for
+# a write are multiplexed as asyncio tasks on a single thread instead of
+# occupying a pool thread each, so in-flight writes scale without
+# per-thread stacks. The shared httpx client keeps sockets alive across
+# writes, like the requests.Session it replaces.
+_REPL_LOOP = asyncio.new_event_loop()
+Thread(target=_REPL_LOOP.run_forever, name="repl-loop", daemon=True).start()
 
-def replicate_to_follower(follower_url, key, value, version):
-    """Replicate a write to a single follower with simulated network delay."""
-    # Simulate network lag
-    delay = random.uniform(MIN_DELAY, MAX_DELAY)
-    time.sleep(delay)
-    
+_REPL_SESSION = None
+_JSON_HDR = {"Content-Type": "application/json"}
+
+
+async def _get_repl_session():
+    global _REPL_SESSION
+    if _REPL_SESSION is None:
+        # http2=True lets one connection per follower multiplex all
+        # in-flight batches as streams; against an HTTP/1.1-only follower
+        # httpx falls back to keep-alive HTTP/1.1 on the same pool
+        _REPL_SESSION = httpx.AsyncClient(
+            http2=True,
+            timeout=5.0,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        )
+    return _REPL_SESSION
+
+
+def _shutdown_replication():
+    if _REPL_SESSION is not None:
+        asyncio.run_coroutine_threadsafe(_REPL_SESSION.aclose(), _REPL_LOOP).result(timeout=2)
+    _REPL_LOOP.call_soon_threadsafe(_REPL_LOOP.stop)
+
+
+atexit.register(_shutdown_replication)
+
+
+async def _replicate_batch_to(session, follower_url, payload, batch):
+    """POST one coalesced batch to a single follower and ack its entries."""
+    # Simulate network lag once per batch, not per write
+    if SIMULATE_DELAY:
+        await asyncio.sleep(random.random() * _DELAY_SPAN + MIN_DELAY)
+
+    ok = False
     try:
-        response = requests.post(
-            f"{follower_url}/replicate",
-            json={"key": key, "value": value, "version": version},
-            timeout=5
+        response = await session.post(
+            f"{follower_url}/replicate_batch", content=payload, headers=_JSON_HDR
         )
-        return response.status_code == 200
+        ok = response.status_code == 200
     except Exception as e:
-        logger.error(f"Failed to replicate to {follower_url}: {e}")
-        return False
+        logger.error(f"Failed to replicate batch to {follower_url}: {e}")
+
+    # Acks are counted on the loop thread only, so plain ints suffice;
+    # the Event releases the waiting /write once the quorum is in
+    for entry in batch:
+        if ok:
+            entry["acks"] += 1
+            if entry["acks"] == WRITE_QUORUM:
+                entry["event"].set()
+        else:
+            entry["fails"] += 1
+            if entry["fails"] > len(FOLLOWERS) - WRITE_QUORUM:
+                entry["event"].set()
+
+
+_pending = []
+_pending_lock = Lock()
+_flush_scheduled = False
+
+
+async def _flush_after_window():
+    global _flush_scheduled
+    await asyncio.sleep(BATCH_WINDOW_MS / 1000.0)
+    with _pending_lock:
+        batch = _pending[:]
+        _pending.clear()
+        _flush_scheduled = False
+    if not batch:
+        return
+
+    session = await _get_repl_session()
+    # Serialize once; all five followers receive the same bytes
+    payload = orjson.dumps({
+        "entries": [
+            {"key": e["key"], "value": e["value"], "version": e["version"]}
+            for e in batch
+        ]
+    })
+    tasks = [
+        asyncio.ensure_future(_replicate_batch_to(session, follower, payload, batch))
+        for follower in FOLLOWERS
+    ]
+    # Once every entry in the batch has resolved (quorum met or become
+    # impossible), the still-pending POSTs only add background socket and
+    # CPU load - cancel them instead of letting them run out the
+    # simulated lag
+    for completed in asyncio.as_completed(tasks):
+        await completed
+        if all(entry["event"].is_set() for entry in batch):
+            break
+    for task in tasks:
+        if not task.done():
+            task.cancel()
 
 
 def replicate_to_followers(key, value, version):
     """
-    Replicate to followers concurrently using semi-synchronous replication.
-    Returns True if at least WRITE_QUORUM followers acknowledge the write.
+    Replicate to followers using semi-synchronous micro-batched replication.
+
+    The write joins the current batch window; one POST per follower then
+    carries every write from the window, amortizing HTTP framing and
+    handler overhead across the batch. Returns True once WRITE_QUORUM
+    followers have acknowledged the batch containing this write.
     """
-    successful_replications = 0
-    failed_replications = 0
-    total_followers = len(FOLLOWERS)
-    
-    executor = ThreadPoolExecutor(max_workers=total_followers)
+    global _flush_scheduled
     start_time = time.time()
+    entry = {"key": key, "value": value, "version": version,
+             "acks": 0, "fails": 0, "event": Event()}
 
-    # Use ThreadPoolExecutor for concurrent replication
-    try:
-        # Submit all replication tasks concurrently
-        future_to_follower = {
-            executor.submit(replicate_to_follower, follower, key, value, version): follower 
-            for follower in FOLLOWERS
-        }
-        
-        # Wait for futures to complete and count successes
-        for future in as_completed(future_to_follower):
-            follower = future_to_follower[future]
-            try:
-                if future.result():
-                    successful_replications += 1
-                    logger.debug(f"Successfully replicated to {follower}")
-
-                    # Early return: quorum reached
-                    if successful_replications >= WRITE_QUORUM:
-                        elapsed = (time.time() - start_time) * 1000  # ms
-                        logger.info(f"Write quorum met ({successful_replications}/{WRITE_QUORUM}) in {elapsed:.2f}ms")
-                        return True
-                else:
-                    failed_replications += 1
-                    logger.warning(f"Failed to replicate to {follower}")
-            except Exception as e:
-                failed_replications += 1
-                logger.error(f"Exception while replicating to {follower}: {e}")
-
-            remaining = total_followers - (successful_replications + failed_replications)
-            if successful_replications + remaining < WRITE_QUORUM:
-                logger.error(f"Write quorum impossible to reach ({successful_replications} success, "
-                           f"{failed_replications} failed, {remaining} pending)")
-                return False
-        
-        return successful_replications >= WRITE_QUORUM
-    
-    finally:
-        # Clean up executor (don't wait for remaining tasks)
-        executor.shutdown(wait=False)
+    with _pending_lock:
+        _pending.append(entry)
+        schedule = not _flush_scheduled
+        if schedule:
+            _flush_scheduled = True
+    if schedule:
+        _REPL_LOOP.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(_flush_after_window())
+        )
+
+    entry["event"].wait(timeout=10)
+    if entry["acks"] >= WRITE_QUORUM:
+        elapsed = (time.time() - start_time) * 1000  # ms
+        logger.info(f"Write quorum met ({entry['acks']}/{WRITE_QUORUM}) in {elapsed:.2f}ms")
+        return True
+    return False
 
 
 @app.route('/write', methods=['POST'])
 def write():
     """Write endpoint - only accepts writes on the leader."""
-    global version_counter
-    
-    data = request.get_json()
+    global data_store
+
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return ojson({"error": "invalid JSON"}, status=400)
     key = data.get('key')
     value = data.get('value')
     
     if key is None or value is None:
-        return jsonify({"error": "key and value are required"}), 400
+        return ojson({"error": "key and value are required"}, status=400)
     
-    # Increment version counter (Lamport timestamp)
-    with version_lock:
-        version_counter += 1
-        current_version = version_counter
-    
-    # Write to leader's store with the version
+    # Increment version counter (Lamport timestamp) - atomic, lock-free
+    current_version = next_version()
+
+    # Write to leader's store with the version: copy, mutate, rebind
     with store_lock:
-        data_store[key] = {
+        new_store = data_store.copy()
+        new_store[key] = {
             "value": value,
             "version": current_version
         }
+        data_store = new_store
     
     # Replicate to followers (semi-synchronous) with the version
     if replicate_to_followers(key, value, current_version):
         logger.info(f"Write successful for key={key}, value={value}, version={current_version}")
-        return jsonify({"status": "success", "key": key, "value": value, "version": current_version}), 200
+        return ojson({"status": "success", "key": key, "value": value, "version": current_version})
     else:
         # Replication didn't meet quorum, but data is already written to leader
         logger.warning(f"Write quorum not met for key={key}, but data written to leader")
-        return jsonify({"status": "partial_success", "key": key, "value": value, "version": current_version,
-                       "warning": "Write quorum not met"}), 200
+        return ojson({"status": "partial_success", "key": key, "value": value, "version": current_version,
+                      "warning": "Write quorum not met"})
+
+
+@app.route('/write_batch', methods=['POST'])
+def write_batch():
+    """Accept many writes in one request.
+
+    The whole batch is versioned and applied under a single lock
+    acquisition and rides the same replication window as /write, so N
+    writes cost one HTTP round-trip instead of N while keeping the same
+    Lamport ordering.
+    """
+    global data_store, _flush_scheduled
+
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return ojson({"error": "invalid JSON"}, status=400)
+    entries = data.get('entries') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return ojson({"error": "entries list is required"}, status=400)
+
+    # Version and apply the batch atomically: one copy of the store, one
+    # rebind, versions assigned in request order
+    batch = []
+    with store_lock:
+        new_store = data_store.copy()
+        for entry in entries:
+            key = entry.get('key')
+            value = entry.get('value')
+            if key is None or value is None:
+                return ojson({"error": "key and value are required"}, status=400)
+            current_version = next_version()
+            new_store[key] = {
+                "value": value,
+                "version": current_version
+            }
+            batch.append({"key": key, "value": value, "version": current_version,
+                          "acks": 0, "fails": 0, "event": Event()})
+        data_store = new_store
+
+    # Queue every entry into the current replication window in one go
+    with _pending_lock:
+        _pending.extend(batch)
+        schedule = not _flush_scheduled
+        if schedule:
+            _flush_scheduled = True
+    if schedule:
+        _REPL_LOOP.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(_flush_after_window())
+        )
+
+    deadline = time.time() + 10
+    quorum_met = True
+    for entry in batch:
+        entry["event"].wait(timeout=max(0.0, deadline - time.time()))
+        if entry["acks"] < WRITE_QUORUM:
+            quorum_met = False
+
+    results = [{"key": entry["key"], "version": entry["version"]} for entry in batch]
+    if quorum_met:
+        logger.info(f"Batch write successful for {len(batch)} entries")
+        return ojson({"status": "success", "results": results})
+    logger.warning(f"Write quorum not met for batch of {len(batch)}, but data written to leader")
+    return ojson({"status": "partial_success", "results": results,
+                  "warning": "Write quorum not met"})
 
 
 @app.route('/read', methods=['GET'])
@@ -147,28 +298,55 @@ def read():
     key = request.args.get('key')
     
     if key is None:
-        return jsonify({"error": "key parameter is required"}), 400
-    
-    with store_lock:
-        data = data_store.get(key)
+        return ojson({"error": "key parameter is required"}, status=400)
     
+    # Lock-free read against the current snapshot
+    data = data_store.get(key)
+
     if data is None:
-        return jsonify({"error": "key not found"}), 404
+        return ojson({"error": "key not found"}, status=404)
     
-    return jsonify({"key": key, "value": data["value"], "version": data["version"]}), 200
+    return ojson({"key": key, "value": data["value"], "version": data["version"]})
 
 
 @app.route('/data', methods=['GET'])
 def get_all_data():
     """Return all data in the store (for testing/verification)."""
-    with store_lock:
-        return jsonify(data_store.copy()), 200
+    # Stream the snapshot key by key instead of materializing the whole
+    # store as one JSON string; the snapshot is immutable once published,
+    # so it is safe to iterate while the response trickles out
+    snap = data_store
+
+    def _gen():
+        yield b'{'
+        first = True
+        for k, v in snap.items():
+            if first:
+                first = False
+            else:
+                yield b','
+            # Non-string keys become their JSON value form, quoted
+            # (5 -> "5", True -> "true", None -> "null") - the same
+            # coercion jsonify used and the followers' OPT_NON_STR_KEYS
+            # /data applies, so consistency checks compare like for like
+            if isinstance(k, str):
+                yield orjson.dumps(k) + b':' + orjson.dumps(v)
+            else:
+                yield b'"' + orjson.dumps(k) + b'":' + orjson.dumps(v)
+        yield b'}'
+
+    return Response(_gen(), mimetype='application/json')
+
+
+# The health payload never changes; encode it once so each probe only
+# wraps pre-built bytes
+_HEALTH_JSON = orjson.dumps({"status": "healthy", "role": "leader"})
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({"status": "healthy", "role": "leader"}), 200
+    return Response(_HEALTH_JSON, mimetype='application/json')
 
 
 def signal_handler(sig, frame):
@@ -177,6 +355,11 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 
+# In docker-compose the leader runs under gunicorn (gthread worker), so
+# the Werkzeug dev server below is only a local fallback. The gthread
+# worker keeps real OS threads, which the background replication loop
+# thread and the Event-based quorum waits rely on (gevent would
+# monkey-patch both away).
 if __name__ == '__main__':
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)